@@ -6,9 +6,16 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import os
+import json
+import struct
 import hashlib
 import subprocess
 import re
+import shlex
+import functools
+from dataclasses import dataclass, fields, replace
+from typing import Optional
+from collections import namedtuple
 
 from migen import *
 
@@ -27,6 +34,226 @@ from litex.soc.cores.cpu import CPU, CPU_GCC_TRIPLE_RISCV32, CPU_GCC_TRIPLE_RISC
 
 CPU_VARIANTS = ["cached", "linux", "debian"]
 
+# Helpers ------------------------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=8)
+def _compute_netlist_digest(key, regions):
+    # Scalar parameters (int/str/bool/None) have a canonical repr.
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16)
+    # Regions are hashed as arrays: origins/sizes packed in bulk, then modes and buses.
+    n = len(regions)
+    digest.update(struct.pack(f"<{1 + 2*n}Q", n, *(r.origin for r in regions), *(r.size for r in regions)))
+    digest.update(",".join(r.mode for r in regions).encode("utf-8") + b"|")
+    digest.update(",".join(r.bus  for r in regions).encode("utf-8"))
+    return digest.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def _vdir():
+    return get_data_mod("cpu", "vexiiriscv").data_location
+
+# RAM implementation per platform base class (By default, use Generic RAM implementation).
+_RAM_IMPL = {
+    "AlteraPlatform" : "Ram_1w_1rs_Intel.v",  # On Altera/Intel platforms, use specific implementation.
+    "EfinixPlatform" : "Ram_1w_1rs_Efinix.v", # On Efinix platforms, use specific implementation.
+}
+
+def _ram_filename(platform):
+    for cls in type(platform).__mro__:
+        if cls.__name__ in _RAM_IMPL:
+            return _RAM_IMPL[cls.__name__]
+    return "Ram_1w_1rs_Generic.v"
+
+# Command line arguments ---------------------------------------------------------------------------
+
+_CPU_ARGS = (
+    ("--vexii-args",            dict(default="",            help="Specify the CPU configuration")),
+    # ("--xlen",                  dict(default=32,            help="Specify the RISC-V data width.")),
+    ("--cpu-count",             dict(default=1, type=int,   help="How many VexiiRiscv CPU.")),
+    ("--with-coherent-dma",     dict(action="store_true",   help="Enable coherent DMA accesses.")),
+    ("--with-jtag-tap",         dict(action="store_true",   help="Add a embedded JTAG tap for debugging.")),
+    ("--with-jtag-instruction", dict(action="store_true",   help="Add a JTAG instruction port which implement tunneling for debugging (TAP not included).")),
+    ("--update-repo",           dict(default="recommended", choices=["latest","wipe+latest","recommended","wipe+recommended","no"], help="Specify how the VexiiRiscv & SpinalHDL repo should be updated (latest: update to HEAD, recommended: Update to known compatible version, no: Don't update, wipe+*: Do clean&reset before checkout)")),
+    ("--no-netlist-cache",      dict(action="store_true",   help="Always (re-)build the netlist.")),
+    # ("--with-fpu",              dict(action="store_true",   help="Enable the F32/F64 FPU.")),
+    # ("--with-rvc",              dict(action="store_true",   help="Enable the Compress ISA extension.")),
+    ("--l2-bytes",              dict(default=0, type=int,   help="VexiiRiscv L2 bytes, default 128 KB.")),
+    ("--l2-ways",               dict(default=0, type=int,   help="VexiiRiscv L2 ways, default 8.")),
+    ("--l2-self-flush",         dict(default=None,          help="VexiiRiscv L2 ways will self flush on from,to,cycles")),
+    ("--with-axi3",             dict(action="store_true",   help="mbus will be axi3 instead of axi4")),
+)
+
+# Bus Wiring ---------------------------------------------------------------------------------------
+
+# (Port name, Bus signal path (None: Open), Direction).
+_PBUS_SIGS = (
+    ("awvalid", "aw.valid", "o"),
+    ("awready", "aw.ready", "i"),
+    ("awaddr",  "aw.addr",  "o"),
+    ("awprot",  None,       "o"),
+    ("wvalid",  "w.valid",  "o"),
+    ("wready",  "w.ready",  "i"),
+    ("wdata",   "w.data",   "o"),
+    ("wstrb",   "w.strb",   "o"),
+    ("bvalid",  "b.valid",  "i"),
+    ("bready",  "b.ready",  "o"),
+    ("bresp",   "b.resp",   "i"),
+    ("arvalid", "ar.valid", "o"),
+    ("arready", "ar.ready", "i"),
+    ("araddr",  "ar.addr",  "o"),
+    ("arprot",  None,       "o"),
+    ("rvalid",  "r.valid",  "i"),
+    ("rready",  "r.ready",  "o"),
+    ("rdata",   "r.data",   "i"),
+    ("rresp",   "r.resp",   "i"),
+)
+
+_MBUS_SIGS = (
+    # AW Channel.
+    ("awvalid",   "aw.valid", "o"),
+    ("awready",   "aw.ready", "i"),
+    ("awaddr",    "aw.addr",  "o"),
+    ("awid",      "aw.id",    "o"),
+    ("awlen",     "aw.len",   "o"),
+    ("awsize",    "aw.size",  "o"),
+    ("awburst",   "aw.burst", "o"),
+    ("awallStrb", None,       "o"),
+    # W Channel.
+    ("wvalid",    "w.valid",  "o"),
+    ("wready",    "w.ready",  "i"),
+    ("wdata",     "w.data",   "o"),
+    ("wstrb",     "w.strb",   "o"),
+    ("wlast",     "w.last",   "o"),
+    # B Channel.
+    ("bvalid",    "b.valid",  "i"),
+    ("bready",    "b.ready",  "o"),
+    ("bid",       "b.id",     "i"),
+    ("bresp",     "b.resp",   "i"),
+    # AR Channel.
+    ("arvalid",   "ar.valid", "o"),
+    ("arready",   "ar.ready", "i"),
+    ("araddr",    "ar.addr",  "o"),
+    ("arid",      "ar.id",    "o"),
+    ("arlen",     "ar.len",   "o"),
+    ("arsize",    "ar.size",  "o"),
+    ("arburst",   "ar.burst", "o"),
+    # R Channel.
+    ("rvalid",    "r.valid",  "i"),
+    ("rready",    "r.ready",  "o"),
+    ("rdata",     "r.data",   "i"),
+    ("rid",       "r.id",     "i"),
+    ("rresp",     "r.resp",   "i"),
+    ("rlast",     "r.last",   "i"),
+)
+
+_DMA_BUS_SIGS = (
+    # AW Channel.
+    ("awready", "aw.ready", "o"),
+    ("awvalid", "aw.valid", "i"),
+    ("awid",    "aw.id",    "i"),
+    ("awaddr",  "aw.addr",  "i"),
+    ("awlen",   "aw.len",   "i"),
+    ("awsize",  "aw.size",  "i"),
+    ("awburst", "aw.burst", "i"),
+    ("awlock",  "aw.lock",  "i"),
+    ("awcache", "aw.cache", "i"),
+    ("awprot",  "aw.prot",  "i"),
+    ("awqos",   "aw.qos",   "i"),
+    # W Channel.
+    ("wready",  "w.ready",  "o"),
+    ("wvalid",  "w.valid",  "i"),
+    ("wdata",   "w.data",   "i"),
+    ("wstrb",   "w.strb",   "i"),
+    ("wlast",   "w.last",   "i"),
+    # B Channel.
+    ("bready",  "b.ready",  "i"),
+    ("bvalid",  "b.valid",  "o"),
+    ("bid",     "b.id",     "o"),
+    ("bresp",   "b.resp",   "o"),
+    # AR Channel.
+    ("arready", "ar.ready", "o"),
+    ("arvalid", "ar.valid", "i"),
+    ("arid",    "ar.id",    "i"),
+    ("araddr",  "ar.addr",  "i"),
+    ("arlen",   "ar.len",   "i"),
+    ("arsize",  "ar.size",  "i"),
+    ("arburst", "ar.burst", "i"),
+    ("arlock",  "ar.lock",  "i"),
+    ("arcache", "ar.cache", "i"),
+    ("arprot",  "ar.prot",  "i"),
+    ("arqos",   "ar.qos",   "i"),
+    # R Channel.
+    ("rready",  "r.ready",  "i"),
+    ("rvalid",  "r.valid",  "o"),
+    ("rid",     "r.id",     "o"),
+    ("rdata",   "r.data",   "o"),
+    ("rresp",   "r.resp",   "o"),
+    ("rlast",   "r.last",   "o"),
+)
+
+# (Attribute, Port).
+_JTAG_TAP_PORTS = (
+    ("jtag_tms", "i_debug_tap_jtag_tms"),
+    ("jtag_clk", "i_debug_tap_jtag_tck"),
+    ("jtag_tdi", "i_debug_tap_jtag_tdi"),
+    ("jtag_tdo", "o_debug_tap_jtag_tdo"),
+)
+
+_JTAG_INSTRUCTION_PORTS = (
+    ("jtag_clk",     "i_debug_tck"),
+    ("jtag_enable",  "i_debug_instruction_instruction_enable"),
+    ("jtag_capture", "i_debug_instruction_instruction_capture"),
+    ("jtag_shift",   "i_debug_instruction_instruction_shift"),
+    ("jtag_update",  "i_debug_instruction_instruction_update"),
+    ("jtag_reset",   "i_debug_instruction_instruction_reset"),
+    ("jtag_tdi",     "i_debug_instruction_instruction_tdi"),
+    ("jtag_tdo",     "o_debug_instruction_instruction_tdo"),
+)
+
+def _resolve(bus, path):
+    if path is None:
+        return Open()
+    obj = bus
+    for attr in path.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+def _bus_params(prefix, bus, sigs):
+    return {f"{direction}_{prefix}_{name}": _resolve(bus, path) for name, path, direction in sigs}
+
+# sbt Commands -------------------------------------------------------------------------------------
+
+# sbt splits runMain arguments on whitespace and accepts double-quoted (backslash-escaped) tokens.
+def _sbt_quote(arg):
+    if arg and re.search(r'[\s"\\]', arg) is None:
+        return arg
+    return '"' + arg.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _sbt_run_main(main, args):
+    return ["sbt", " ".join([f"runMain {main}", *(_sbt_quote(arg) for arg in args)])]
+
+# Memory Region ------------------------------------------------------------------------------------
+
+# Memory region from CPU perspective (see do_finalize for modes/buses).
+VexiiRiscvRegion = namedtuple("VexiiRiscvRegion", "origin size mode bus")
+
+# Configuration ------------------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class VexiiRiscvConfig:
+    vexii_args       : str           = ""
+    cpu_count        : int           = 1
+    litedram_width   : int           = 32
+    l2_bytes         : int           = 0
+    l2_ways          : int           = 4
+    l2_self_flush    : Optional[str] = None
+    with_dma         : bool          = False
+    with_axi3        : bool          = False
+    jtag_tap         : bool          = False
+    jtag_instruction : bool          = False
+    no_netlist_cache : bool          = False
+    reset_address    : Optional[int] = None
+    memory_regions   : tuple         = () # VexiiRiscvRegion.
+
 # VexiiRiscv -----------------------------------------------------------------------------------------
 
 class VexiiRiscv(CPU):
@@ -42,25 +269,15 @@ class VexiiRiscv(CPU):
     nop                  = "nop"
     io_regions           = {0x8000_0000: 0x8000_0000} # Origin, Length.
 
-    # Default parameters.
+    # Default parameters (netlist parameters default to VexiiRiscvConfig, see get_config).
     netlist_name     = None
     xlen             = 32
     internal_bus_width = 32
-    litedram_width   = 32
-    l2_bytes         = 0
-    l2_ways          = 4
-    l2_self_flush    = None
     with_rvc         = False
     with_rvm         = False
     with_rvf         = False
     with_rvd         = False
     with_rva         = False
-    with_dma         = False
-    with_axi3        = False
-    jtag_tap         = False
-    jtag_instruction = False
-    vexii_args       = ""
-
 
     # ABI.
     @staticmethod
@@ -123,29 +340,12 @@ class VexiiRiscv(CPU):
     def args_fill(parser):
         cpu_group = parser.add_argument_group(title="CPU options")
 
-        cpu_group.add_argument("--vexii-args",            default="",            help="Specify the CPU configuration")
-        # cpu_group.add_argument("--xlen",                  default=32,            help="Specify the RISC-V data width.")
-        cpu_group.add_argument("--cpu-count",             default=1,             help="How many VexiiRiscv CPU.")
-        cpu_group.add_argument("--with-coherent-dma",     action="store_true",   help="Enable coherent DMA accesses.")
-        cpu_group.add_argument("--with-jtag-tap",         action="store_true",   help="Add a embedded JTAG tap for debugging.")
-        cpu_group.add_argument("--with-jtag-instruction", action="store_true",   help="Add a JTAG instruction port which implement tunneling for debugging (TAP not included).")
-        cpu_group.add_argument("--update-repo",           default="recommended", choices=["latest","wipe+latest","recommended","wipe+recommended","no"], help="Specify how the VexiiRiscv & SpinalHDL repo should be updated (latest: update to HEAD, recommended: Update to known compatible version, no: Don't update, wipe+*: Do clean&reset before checkout)")
-        cpu_group.add_argument("--no-netlist-cache",      action="store_true",   help="Always (re-)build the netlist.")
-        # cpu_group.add_argument("--with-fpu",              action="store_true",   help="Enable the F32/F64 FPU.")
-        # cpu_group.add_argument("--with-rvc",              action="store_true",   help="Enable the Compress ISA extension.")
-        cpu_group.add_argument("--l2-bytes",              default=0,             help="VexiiRiscv L2 bytes, default 128 KB.")
-        cpu_group.add_argument("--l2-ways",               default=0,             help="VexiiRiscv L2 ways, default 8.")
-        cpu_group.add_argument("--l2-self-flush",         default=None,          help="VexiiRiscv L2 ways will self flush on from,to,cycles")
-        cpu_group.add_argument("--with-axi3",             action="store_true",   help="mbus will be axi3 instead of axi4")
-
-
-
+        for name, kwargs in _CPU_ARGS:
+            cpu_group.add_argument(name, **kwargs)
 
     @staticmethod
     def args_read(args):
-        print(args)
-
-        vdir = get_data_mod("cpu", "vexiiriscv").data_location
+        vdir = _vdir()
         ndir = os.path.join(vdir, "ext", "VexiiRiscv")
 
         NaxRiscv.git_setup("VexiiRiscv", ndir, "https://github.com/SpinalHDL/VexiiRiscv.git", "dev", "36dad634", args.update_repo)
@@ -153,7 +353,7 @@ class VexiiRiscv(CPU):
         if not args.cpu_variant:
             args.cpu_variant = "standard"
 
-        VexiiRiscv.vexii_args += " --with-mul --with-div --allow-bypass-from=0 --performance-counters=0"
+        VexiiRiscv.vexii_args  = " --with-mul --with-div --allow-bypass-from=0 --performance-counters=0"
         VexiiRiscv.vexii_args += " --fetch-l1 --fetch-l1-ways=2"
         VexiiRiscv.vexii_args += " --lsu-l1 --lsu-l1-ways=2  --with-lsu-bypass"
         VexiiRiscv.vexii_args += " --relaxed-branch"
@@ -184,8 +384,8 @@ class VexiiRiscv(CPU):
         vexii_args_hash = md5_hash.hexdigest()
         ppath = os.path.join(vdir, str(vexii_args_hash) + ".py")
         if VexiiRiscv.no_netlist_cache or not os.path.exists(ppath):
-            cmd = f"""cd {ndir} && sbt "runMain vexiiriscv.soc.litex.PythonArgsGen {VexiiRiscv.vexii_args} --python-file={str(ppath)}\""""
-            subprocess.check_call(cmd, shell=True)
+            cmd = _sbt_run_main("vexiiriscv.soc.litex.PythonArgsGen", [*shlex.split(VexiiRiscv.vexii_args), f"--python-file={ppath}"])
+            subprocess.run(cmd, cwd=ndir, check=True)
         with open(ppath) as file:
             exec(file.read())
 
@@ -202,8 +402,14 @@ class VexiiRiscv(CPU):
             VexiiRiscv.l2_self_flush = args.l2_self_flush
 
 
-    def __init__(self, platform, variant):
+    # Configuration (from command line arguments, set on the class by args_read).
+    @staticmethod
+    def get_config():
+        return VexiiRiscvConfig(**{f.name: getattr(VexiiRiscv, f.name) for f in fields(VexiiRiscvConfig) if hasattr(VexiiRiscv, f.name)})
+
+    def __init__(self, platform, variant, config=None):
         self.platform         = platform
+        self.config           = config = config or VexiiRiscv.get_config()
         self.variant          = "standard"
         self.reset            = Signal()
         self.interrupt        = Signal(32)
@@ -229,164 +435,101 @@ class VexiiRiscv(CPU):
 
             # Interrupt.
             i_peripheral_externalInterrupts_port = self.interrupt,
-
-            # Peripheral Memory Bus (AXI Lite Slave).
-            o_pBus_awvalid = pbus.aw.valid,
-            i_pBus_awready = pbus.aw.ready,
-            o_pBus_awaddr  = pbus.aw.addr,
-            o_pBus_awprot  = Open(),
-            o_pBus_wvalid  = pbus.w.valid,
-            i_pBus_wready  = pbus.w.ready,
-            o_pBus_wdata   = pbus.w.data,
-            o_pBus_wstrb   = pbus.w.strb,
-            i_pBus_bvalid  = pbus.b.valid,
-            o_pBus_bready  = pbus.b.ready,
-            i_pBus_bresp   = pbus.b.resp,
-            o_pBus_arvalid = pbus.ar.valid,
-            i_pBus_arready = pbus.ar.ready,
-            o_pBus_araddr  = pbus.ar.addr,
-            o_pBus_arprot  = Open(),
-            i_pBus_rvalid  = pbus.r.valid,
-            o_pBus_rready  = pbus.r.ready,
-            i_pBus_rdata   = pbus.r.data,
-            i_pBus_rresp   = pbus.r.resp,
         )
 
-        if VexiiRiscv.with_dma:
+        # Peripheral Memory Bus (AXI Lite Slave).
+        self.cpu_params.update(_bus_params("pBus", pbus, _PBUS_SIGS))
+
+        if config.with_dma:
             self.dma_bus = dma_bus = axi.AXIInterface(data_width=VexiiRiscv.internal_bus_width, address_width=32, id_width=4)
 
-            self.cpu_params.update(
-                # DMA Bus.
-                # --------
-                # AW Channel.
-                o_dma_bus_awready = dma_bus.aw.ready,
-                i_dma_bus_awvalid = dma_bus.aw.valid,
-                i_dma_bus_awid    = dma_bus.aw.id,
-                i_dma_bus_awaddr  = dma_bus.aw.addr,
-                i_dma_bus_awlen   = dma_bus.aw.len,
-                i_dma_bus_awsize  = dma_bus.aw.size,
-                i_dma_bus_awburst = dma_bus.aw.burst,
-                i_dma_bus_awlock  = dma_bus.aw.lock,
-                i_dma_bus_awcache = dma_bus.aw.cache,
-                i_dma_bus_awprot  = dma_bus.aw.prot,
-                i_dma_bus_awqos   = dma_bus.aw.qos,
-
-                # W Channel.
-                o_dma_bus_wready  = dma_bus.w.ready,
-                i_dma_bus_wvalid  = dma_bus.w.valid,
-                i_dma_bus_wdata   = dma_bus.w.data,
-                i_dma_bus_wstrb   = dma_bus.w.strb,
-                i_dma_bus_wlast   = dma_bus.w.last,
-
-                # B Channel.
-                i_dma_bus_bready  = dma_bus.b.ready,
-                o_dma_bus_bvalid  = dma_bus.b.valid,
-                o_dma_bus_bid     = dma_bus.b.id,
-                o_dma_bus_bresp   = dma_bus.b.resp,
-
-                # AR Channel.
-                o_dma_bus_arready = dma_bus.ar.ready,
-                i_dma_bus_arvalid = dma_bus.ar.valid,
-                i_dma_bus_arid    = dma_bus.ar.id,
-                i_dma_bus_araddr  = dma_bus.ar.addr,
-                i_dma_bus_arlen   = dma_bus.ar.len,
-                i_dma_bus_arsize  = dma_bus.ar.size,
-                i_dma_bus_arburst = dma_bus.ar.burst,
-                i_dma_bus_arlock  = dma_bus.ar.lock,
-                i_dma_bus_arcache = dma_bus.ar.cache,
-                i_dma_bus_arprot  = dma_bus.ar.prot,
-                i_dma_bus_arqos   = dma_bus.ar.qos,
-
-                # R Channel.
-                i_dma_bus_rready  = dma_bus.r.ready,
-                o_dma_bus_rvalid  = dma_bus.r.valid,
-                o_dma_bus_rid     = dma_bus.r.id,
-                o_dma_bus_rdata   = dma_bus.r.data,
-                o_dma_bus_rresp   = dma_bus.r.resp,
-                o_dma_bus_rlast   = dma_bus.r.last,
-            )
+            self.cpu_params.update(_bus_params("dma_bus", dma_bus, _DMA_BUS_SIGS))
 
     def set_reset_address(self, reset_address):
-        VexiiRiscv.reset_address = reset_address
-        VexiiRiscv.vexii_args += f" --reset-vector {reset_address}"
+        self.reset_address = reset_address
+        self.config        = replace(self.config, reset_address=reset_address)
 
     # Cluster Name Generation.
     @staticmethod
-    def generate_netlist_name():
-        md5_hash = hashlib.md5()
-        md5_hash.update(str(VexiiRiscv.reset_address).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.litedram_width).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.xlen).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.cpu_count).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.l2_bytes).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.l2_ways).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.l2_self_flush).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.jtag_tap).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.jtag_instruction).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.with_dma).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.with_axi3).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.memory_regions).encode('utf-8'))
-        md5_hash.update(str(VexiiRiscv.vexii_args).encode('utf-8'))
-        # md5_hash.update(str(VexiiRiscv.internal_bus_width).encode('utf-8'))
-
-
-        digest = md5_hash.hexdigest()
-        VexiiRiscv.netlist_name = "VexiiRiscvLitex_" + digest
+    def generate_netlist_name(config):
+        key = (
+            config.reset_address,
+            config.litedram_width,
+            config.cpu_count,
+            config.l2_bytes,
+            config.l2_ways,
+            config.l2_self_flush,
+            config.jtag_tap,
+            config.jtag_instruction,
+            config.with_dma,
+            config.with_axi3,
+            config.vexii_args,
+            # VexiiRiscv.internal_bus_width,
+        )
+        regions = tuple(sorted(config.memory_regions)) # Canonical order, independent of regions insertion order.
+        digest  = _compute_netlist_digest(key, regions)
+        return "VexiiRiscvLitex_" + digest
 
     # Netlist Generation.
     @staticmethod
-    def generate_netlist():
-        vdir = get_data_mod("cpu", "vexiiriscv").data_location
+    def generate_netlist(config):
+        vdir = _vdir()
         ndir = os.path.join(vdir, "ext", "VexiiRiscv")
         sdir = os.path.join(vdir, "ext", "SpinalHDL")
 
+        netlist_name = VexiiRiscv.generate_netlist_name(config)
+
         gen_args = []
-        gen_args.append(f"--netlist-name={VexiiRiscv.netlist_name}")
+        gen_args.append(f"--netlist-name={netlist_name}")
         gen_args.append(f"--netlist-directory={vdir}")
-        gen_args.append(VexiiRiscv.vexii_args)
-        gen_args.append(f"--cpu-count={VexiiRiscv.cpu_count}")
-        gen_args.append(f"--l2-bytes={VexiiRiscv.l2_bytes}")
-        gen_args.append(f"--l2-ways={VexiiRiscv.l2_ways}")
-        if VexiiRiscv.l2_self_flush:
-            gen_args.append(f"--l2-self-flush={VexiiRiscv.l2_self_flush}")
-        gen_args.append(f"--litedram-width={VexiiRiscv.litedram_width}")
+        gen_args.extend(shlex.split(config.vexii_args))
+        gen_args.append(f"--reset-vector={config.reset_address}")
+        gen_args.append(f"--cpu-count={config.cpu_count}")
+        gen_args.append(f"--l2-bytes={config.l2_bytes}")
+        gen_args.append(f"--l2-ways={config.l2_ways}")
+        if config.l2_self_flush:
+            gen_args.append(f"--l2-self-flush={config.l2_self_flush}")
+        gen_args.append(f"--litedram-width={config.litedram_width}")
         # gen_args.append(f"--internal_bus_width={VexiiRiscv.internal_bus_width}")
-        for region in VexiiRiscv.memory_regions:
-            gen_args.append(f"--memory-region={region[0]},{region[1]},{region[2]},{region[3]}")
-        if(VexiiRiscv.jtag_tap) :
+        gen_args.extend(f"--memory-region={origin},{size},{mode},{bus}" for origin, size, mode, bus in config.memory_regions)
+        if(config.jtag_tap) :
             gen_args.append(f"--with-jtag-tap")
-        if(VexiiRiscv.jtag_instruction) :
+        if(config.jtag_instruction) :
             gen_args.append(f"--with-jtag-instruction")
-        if(VexiiRiscv.with_dma) :
+        if(config.with_dma) :
             gen_args.append(f"--with-dma")
-        if(VexiiRiscv.with_axi3) :
+        if(config.with_axi3) :
             gen_args.append(f"--with-axi3")
 
-        cmd = f"""cd {ndir} && sbt "runMain vexiiriscv.soc.litex.SocGen {" ".join(gen_args)}\""""
+        # Skip generation when the netlist was already generated with the same arguments.
+        vpath     = os.path.join(vdir, netlist_name + ".v")
+        apath     = os.path.join(vdir, netlist_name + ".args")
+        args_hash = hashlib.blake2b(json.dumps(gen_args).encode("utf-8"), digest_size=8).hexdigest()
+        if not config.no_netlist_cache and os.path.exists(vpath) and os.path.exists(apath):
+            with open(apath) as f:
+                if f.read() == args_hash:
+                    return
+
+        cmd = _sbt_run_main("vexiiriscv.soc.litex.SocGen", gen_args)
         print("VexiiRiscv generation command :")
-        print(cmd)
-        subprocess.check_call(cmd, shell=True)
+        print(f"cd {shlex.quote(ndir)} && " + " ".join(shlex.quote(arg) for arg in cmd))
+        subprocess.run(cmd, cwd=ndir, check=True)
+
+        # Record generation arguments (atomically, only once the netlist is complete).
+        with open(apath + ".tmp", "w") as f:
+            f.write(args_hash)
+        os.replace(apath + ".tmp", apath)
 
 
     def add_sources(self, platform):
-        vdir = get_data_mod("cpu", "vexiiriscv").data_location
+        vdir = _vdir()
         print(f"VexiiRiscv netlist : {self.netlist_name}")
 
-        if VexiiRiscv.no_netlist_cache or not os.path.exists(os.path.join(vdir, self.netlist_name + ".v")):
-            self.generate_netlist()
+        self.generate_netlist(self.config) # Skipped when the netlist is already up to date.
 
         # Add RAM.
-        # By default, use Generic RAM implementation.
-        ram_filename = "Ram_1w_1rs_Generic.v"
+        ram_filename    = _ram_filename(platform)
         lutram_filename = "Ram_1w_1ra_Generic.v"
-        # On Altera/Intel platforms, use specific implementation.
-        from litex.build.altera import AlteraPlatform
-        if isinstance(platform, AlteraPlatform):
-            ram_filename = "Ram_1w_1rs_Intel.v"
-        # On Efinix platforms, use specific implementation.
-        from litex.build.efinix import EfinixPlatform
-        if isinstance(platform, EfinixPlatform):
-            ram_filename = "Ram_1w_1rs_Efinix.v"
         platform.add_source(os.path.join(vdir, ram_filename), "verilog")
         platform.add_source(os.path.join(vdir, lutram_filename), "verilog")
 
@@ -405,47 +548,20 @@ class VexiiRiscv(CPU):
         soc.bus.add_region("opensbi", SoCRegion(origin=self.mem_map["main_ram"] + 0x00f0_0000, size=0x8_0000, cached=True, linker=True))
 
         # Define ISA.
-        soc.add_config("CPU_COUNT", VexiiRiscv.cpu_count)
+        soc.add_config("CPU_COUNT", self.config.cpu_count)
         soc.add_config("CPU_ISA", VexiiRiscv.get_arch())
         soc.add_config("CPU_MMU", {32 : "sv32", 64 : "sv39"}[VexiiRiscv.xlen])
 
         soc.bus.add_region("plic",  SoCRegion(origin=soc.mem_map.get("plic"),  size=0x40_0000, cached=False,  linker=True))
         soc.bus.add_region("clint", SoCRegion(origin=soc.mem_map.get("clint"), size= 0x1_0000, cached=False,  linker=True))
 
-        if VexiiRiscv.jtag_tap:
-            self.jtag_tms = Signal()
-            self.jtag_clk = Signal()
-            self.jtag_tdi = Signal()
-            self.jtag_tdo = Signal()
-
-            self.cpu_params.update(
-                i_debug_tap_jtag_tms = self.jtag_tms,
-                i_debug_tap_jtag_tck = self.jtag_clk,
-                i_debug_tap_jtag_tdi = self.jtag_tdi,
-                o_debug_tap_jtag_tdo = self.jtag_tdo,
-            )
+        if self.config.jtag_tap:
+            self.add_jtag_ports(_JTAG_TAP_PORTS)
 
-        if VexiiRiscv.jtag_instruction:
-            self.jtag_clk     = Signal()
-            self.jtag_enable  = Signal()
-            self.jtag_capture = Signal()
-            self.jtag_shift   = Signal()
-            self.jtag_update  = Signal()
-            self.jtag_reset   = Signal()
-            self.jtag_tdo     = Signal()
-            self.jtag_tdi     = Signal()
-            self.cpu_params.update(
-                i_debug_tck                             = self.jtag_clk,
-                i_debug_instruction_instruction_enable  = self.jtag_enable,
-                i_debug_instruction_instruction_capture = self.jtag_capture,
-                i_debug_instruction_instruction_shift   = self.jtag_shift,
-                i_debug_instruction_instruction_update  = self.jtag_update,
-                i_debug_instruction_instruction_reset   = self.jtag_reset,
-                i_debug_instruction_instruction_tdi     = self.jtag_tdi,
-                o_debug_instruction_instruction_tdo     = self.jtag_tdo,
-            )
+        if self.config.jtag_instruction:
+            self.add_jtag_ports(_JTAG_INSTRUCTION_PORTS)
 
-        if VexiiRiscv.jtag_instruction or VexiiRiscv.jtag_tap:
+        if self.config.jtag_instruction or self.config.jtag_tap:
             # Create PoR Clk Domain for debug_reset.
             self.cd_debug_por = ClockDomain()
             self.comb += self.cd_debug_por.clk.eq(ClockSignal("sys"))
@@ -473,14 +589,19 @@ class VexiiRiscv(CPU):
 
         self.soc_bus = soc.bus # FIXME: Save SoC Bus instance to retrieve the final mem layout on finalization.
 
+    def add_jtag_ports(self, ports):
+        for attr, port in ports:
+            setattr(self, attr, Signal(name=attr))
+            self.cpu_params[port] = getattr(self, attr)
+
     def add_memory_buses(self, address_width, data_width):
-        VexiiRiscv.litedram_width = data_width
+        self.config = replace(self.config, litedram_width=data_width)
 
         mbus = axi.AXIInterface(
-            data_width    = VexiiRiscv.litedram_width,
+            data_width    = self.config.litedram_width,
             address_width = 32,
             id_width      = 8,
-            version       = "axi3" if VexiiRiscv.with_axi3 else "axi4"
+            version       = "axi3" if self.config.with_axi3 else "axi4"
         )
         self.memory_buses.append(mbus)
 
@@ -496,47 +617,10 @@ class VexiiRiscv(CPU):
         self.comb += mbus.ar.qos.eq(0)
         #self.comb += mbus.ar.region.eq(0)
 
-        self.cpu_params.update(
-            # Memory Bus (Master).
-            # --------------------
-            # AW Channel.
-            o_mBus_awvalid   = mbus.aw.valid,
-            i_mBus_awready   = mbus.aw.ready,
-            o_mBus_awaddr    = mbus.aw.addr,
-            o_mBus_awid      = mbus.aw.id,
-            o_mBus_awlen     = mbus.aw.len,
-            o_mBus_awsize    = mbus.aw.size,
-            o_mBus_awburst   = mbus.aw.burst,
-            o_mBus_awallStrb = Open(),
-            # W Channel.
-            o_mBus_wvalid    = mbus.w.valid,
-            i_mBus_wready    = mbus.w.ready,
-            o_mBus_wdata     = mbus.w.data,
-            o_mBus_wstrb     = mbus.w.strb,
-            o_mBus_wlast     = mbus.w.last,
-            # B Channel.
-            i_mBus_bvalid    = mbus.b.valid,
-            o_mBus_bready    = mbus.b.ready,
-            i_mBus_bid       = mbus.b.id,
-            i_mBus_bresp     = mbus.b.resp,
-            # AR Channel.
-            o_mBus_arvalid   = mbus.ar.valid,
-            i_mBus_arready   = mbus.ar.ready,
-            o_mBus_araddr    = mbus.ar.addr,
-            o_mBus_arid      = mbus.ar.id,
-            o_mBus_arlen     = mbus.ar.len,
-            o_mBus_arsize    = mbus.ar.size,
-            o_mBus_arburst   = mbus.ar.burst,
-            # R Channel.
-            i_mBus_rvalid    = mbus.r.valid,
-            o_mBus_rready    = mbus.r.ready,
-            i_mBus_rdata     = mbus.r.data,
-            i_mBus_rid       = mbus.r.id,
-            i_mBus_rresp     = mbus.r.resp,
-            i_mBus_rlast     = mbus.r.last,
-        )
+        # Memory Bus (Master).
+        self.cpu_params.update(_bus_params("mBus", mbus, _MBUS_SIGS))
 
-        if VexiiRiscv.with_axi3:
+        if self.config.with_axi3:
             self.cpu_params.update(
                 o_mBus_wid=mbus.w.id
             )
@@ -559,9 +643,9 @@ class VexiiRiscv(CPU):
         # vexiiriscv bus:
         # p        : peripheral
         # m        : memory
-        VexiiRiscv.memory_regions = []
+        memory_regions = []
         # for name, region in self.soc_bus.io_regions.items():
-        #     VexiiRiscv.memory_regions.append( (region.origin, region.size, "io", "p") ) # IO is only allowed on the p bus
+        #     memory_regions.append( (region.origin, region.size, "io", "p") ) # IO is only allowed on the p bus
         for name, region in self.soc_bus.regions.items():
             if region.linker: # Remove virtual regions.
                 continue
@@ -571,9 +655,10 @@ class VexiiRiscv(CPU):
                 bus = "p"
             mode = region.mode
             mode += "c" if region.cached else ""
-            VexiiRiscv.memory_regions.append( (region.origin, region.size, mode, bus) )
+            memory_regions.append(VexiiRiscvRegion(region.origin, region.size, mode, bus))
+        self.config = replace(self.config, memory_regions=tuple(memory_regions))
 
-        self.generate_netlist_name()
+        self.netlist_name = self.generate_netlist_name(self.config)
 
         # Do verilog instance.
         self.specials += Instance(self.netlist_name, **self.cpu_params)
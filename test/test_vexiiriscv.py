@@ -0,0 +1,279 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import subprocess
+import unittest
+import tempfile
+from unittest import mock
+
+from migen import *
+
+from litex.gen import *
+
+from litex.build.generic_platform import GenericPlatform
+from litex.build.altera import AlteraPlatform
+from litex.build.efinix import EfinixPlatform
+
+from litex.soc.interconnect import axi
+
+import litex.soc.cores.cpu.vexiiriscv.core as vexii_core
+from litex.soc.cores.cpu.vexiiriscv.core import VexiiRiscv, VexiiRiscvConfig, VexiiRiscvRegion
+
+# Helpers ------------------------------------------------------------------------------------------
+
+def _config(**kwargs):
+    kwargs.setdefault("reset_address",  0x0000_0000)
+    kwargs.setdefault("memory_regions", (
+        VexiiRiscvRegion(0x0000_0000, 0x0002_0000, "rxc",  "p"),
+        VexiiRiscvRegion(0x4000_0000, 0x1000_0000, "rwxc", "m"),
+        VexiiRiscvRegion(0xf000_0000, 0x0001_0000, "rw",   "p"),
+    ))
+    return VexiiRiscvConfig(**kwargs)
+
+# Expected Instance ports (Previously written out explicitly in cpu_params).
+PBUS_PORTS = {
+    "o_pBus_awvalid", "i_pBus_awready", "o_pBus_awaddr", "o_pBus_awprot",
+    "o_pBus_wvalid",  "i_pBus_wready",  "o_pBus_wdata",  "o_pBus_wstrb",
+    "i_pBus_bvalid",  "o_pBus_bready",  "i_pBus_bresp",
+    "o_pBus_arvalid", "i_pBus_arready", "o_pBus_araddr", "o_pBus_arprot",
+    "i_pBus_rvalid",  "o_pBus_rready",  "i_pBus_rdata",  "i_pBus_rresp",
+}
+
+MBUS_PORTS = {
+    "o_mBus_awvalid", "i_mBus_awready", "o_mBus_awaddr", "o_mBus_awid", "o_mBus_awlen",
+    "o_mBus_awsize",  "o_mBus_awburst", "o_mBus_awallStrb",
+    "o_mBus_wvalid",  "i_mBus_wready",  "o_mBus_wdata",  "o_mBus_wstrb", "o_mBus_wlast",
+    "i_mBus_bvalid",  "o_mBus_bready",  "i_mBus_bid",    "i_mBus_bresp",
+    "o_mBus_arvalid", "i_mBus_arready", "o_mBus_araddr", "o_mBus_arid", "o_mBus_arlen",
+    "o_mBus_arsize",  "o_mBus_arburst",
+    "i_mBus_rvalid",  "o_mBus_rready",  "i_mBus_rdata",  "i_mBus_rid",  "i_mBus_rresp", "i_mBus_rlast",
+}
+
+DMA_BUS_PORTS = {
+    "o_dma_bus_awready", "i_dma_bus_awvalid", "i_dma_bus_awid",    "i_dma_bus_awaddr", "i_dma_bus_awlen",
+    "i_dma_bus_awsize",  "i_dma_bus_awburst", "i_dma_bus_awlock",  "i_dma_bus_awcache", "i_dma_bus_awprot",
+    "i_dma_bus_awqos",
+    "o_dma_bus_wready",  "i_dma_bus_wvalid",  "i_dma_bus_wdata",   "i_dma_bus_wstrb",  "i_dma_bus_wlast",
+    "i_dma_bus_bready",  "o_dma_bus_bvalid",  "o_dma_bus_bid",     "o_dma_bus_bresp",
+    "o_dma_bus_arready", "i_dma_bus_arvalid", "i_dma_bus_arid",    "i_dma_bus_araddr", "i_dma_bus_arlen",
+    "i_dma_bus_arsize",  "i_dma_bus_arburst", "i_dma_bus_arlock",  "i_dma_bus_arcache", "i_dma_bus_arprot",
+    "i_dma_bus_arqos",
+    "i_dma_bus_rready",  "o_dma_bus_rvalid",  "o_dma_bus_rid",     "o_dma_bus_rdata",  "o_dma_bus_rresp",
+    "o_dma_bus_rlast",
+}
+
+JTAG_TAP_PORTS = {
+    "i_debug_tap_jtag_tms", "i_debug_tap_jtag_tck", "i_debug_tap_jtag_tdi", "o_debug_tap_jtag_tdo",
+}
+
+JTAG_INSTRUCTION_PORTS = {
+    "i_debug_tck",
+    "i_debug_instruction_instruction_enable",
+    "i_debug_instruction_instruction_capture",
+    "i_debug_instruction_instruction_shift",
+    "i_debug_instruction_instruction_update",
+    "i_debug_instruction_instruction_reset",
+    "i_debug_instruction_instruction_tdi",
+    "o_debug_instruction_instruction_tdo",
+}
+
+# Stands in for subprocess.run: records sbt calls and creates the requested netlist.
+class FakeSbt:
+    def __init__(self, vdir, netlist_name):
+        self.vdir         = vdir
+        self.netlist_name = netlist_name
+        self.calls        = []
+
+    def __call__(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        with open(os.path.join(self.vdir, self.netlist_name + ".v"), "w") as f:
+            f.write("module dummy(); endmodule\n")
+        return subprocess.CompletedProcess(cmd, 0)
+
+# Test VexiiRiscv ----------------------------------------------------------------------------------
+
+class TestVexiiRiscv(unittest.TestCase):
+    def generate(self, vdir, config, sbt):
+        with mock.patch.object(vexii_core, "_vdir", return_value=vdir), \
+             mock.patch.object(vexii_core.subprocess, "run", sbt), \
+             mock.patch.object(vexii_core.os, "replace", wraps=os.replace) as replace:
+            VexiiRiscv.generate_netlist(config)
+        return replace
+
+    def test_netlist_args_match_skips_sbt(self):
+        config = _config()
+        name   = VexiiRiscv.generate_netlist_name(config)
+        with tempfile.TemporaryDirectory() as vdir:
+            sbt = FakeSbt(vdir, name)
+            self.generate(vdir, config, sbt)
+            self.assertEqual(len(sbt.calls), 1)
+            self.generate(vdir, config, sbt)
+            self.assertEqual(len(sbt.calls), 1)
+
+    def test_netlist_args_missing_runs_sbt(self):
+        config = _config()
+        name   = VexiiRiscv.generate_netlist_name(config)
+        with tempfile.TemporaryDirectory() as vdir:
+            apath = os.path.join(vdir, name + ".args")
+            # Netlist from a previous run, without .args.
+            with open(os.path.join(vdir, name + ".v"), "w") as f:
+                f.write("")
+            sbt     = FakeSbt(vdir, name)
+            replace = self.generate(vdir, config, sbt)
+            self.assertEqual(len(sbt.calls), 1)
+            replace.assert_called_once_with(apath + ".tmp", apath)
+            self.assertTrue(os.path.exists(apath))
+            self.assertFalse(os.path.exists(apath + ".tmp"))
+
+    def test_netlist_args_mismatch_runs_sbt(self):
+        config = _config()
+        name   = VexiiRiscv.generate_netlist_name(config)
+        with tempfile.TemporaryDirectory() as vdir:
+            apath = os.path.join(vdir, name + ".args")
+            with open(os.path.join(vdir, name + ".v"), "w") as f:
+                f.write("")
+            with open(apath, "w") as f:
+                f.write("0000000000000000")
+            sbt     = FakeSbt(vdir, name)
+            replace = self.generate(vdir, config, sbt)
+            self.assertEqual(len(sbt.calls), 1)
+            replace.assert_called_once_with(apath + ".tmp", apath)
+            with open(apath) as f:
+                self.assertNotEqual(f.read(), "0000000000000000")
+            # Hash now matches: next generation is skipped.
+            self.generate(vdir, config, sbt)
+            self.assertEqual(len(sbt.calls), 1)
+
+    def test_no_netlist_cache_runs_sbt(self):
+        config = _config(no_netlist_cache=True)
+        name   = VexiiRiscv.generate_netlist_name(config)
+        with tempfile.TemporaryDirectory() as vdir:
+            sbt = FakeSbt(vdir, name)
+            self.generate(vdir, config, sbt)
+            self.generate(vdir, config, sbt)
+            self.assertEqual(len(sbt.calls), 2)
+
+    def test_sbt_command(self):
+        config = _config(vexii_args='--with-mul --region "a b" --path="C:\\\\sbt"')
+        name   = VexiiRiscv.generate_netlist_name(config)
+        with tempfile.TemporaryDirectory(prefix="vexii riscv ") as vdir:
+            sbt = FakeSbt(vdir, name)
+            self.generate(vdir, config, sbt)
+            self.assertEqual(sbt.calls, [["sbt", " ".join([
+                "runMain vexiiriscv.soc.litex.SocGen",
+                f"--netlist-name={name}",
+                f'"--netlist-directory={vdir}"',
+                "--with-mul", "--region", '"a b"', '"--path=C:\\\\sbt"',
+                "--reset-vector=0", "--cpu-count=1", "--l2-bytes=0", "--l2-ways=4", "--litedram-width=32",
+                "--memory-region=0,131072,rxc,p",
+                "--memory-region=1073741824,268435456,rwxc,m",
+                "--memory-region=4026531840,65536,rw,p",
+            ])]])
+
+        # PythonArgsGen goes through the same helper.
+        self.assertEqual(vexii_core._sbt_run_main("vexiiriscv.soc.litex.PythonArgsGen", ['--say="hi"', ""]),
+            ["sbt", 'runMain vexiiriscv.soc.litex.PythonArgsGen "--say=\\"hi\\"" ""'])
+
+    def test_pbus_ports(self):
+        pbus   = axi.AXILiteInterface(address_width=32, data_width=32)
+        params = vexii_core._bus_params("pBus", pbus, vexii_core._PBUS_SIGS)
+        self.assertEqual(set(params.keys()), PBUS_PORTS)
+        self.assertIs(params["o_pBus_awvalid"], pbus.aw.valid)
+        self.assertIs(params["i_pBus_rdata"],   pbus.r.data)
+        self.assertIsInstance(params["o_pBus_awprot"], Open)
+        self.assertIsInstance(params["o_pBus_arprot"], Open)
+
+        # Instance keeps the pBus ports next to Clk/Rst and Interrupt.
+        cpu = VexiiRiscv(platform=None, variant="standard", config=_config())
+        self.assertEqual(set(cpu.cpu_params.keys()), PBUS_PORTS | {
+            "i_system_clk", "i_system_reset", "i_peripheral_externalInterrupts_port"})
+
+    def test_mbus_ports(self):
+        mbus   = axi.AXIInterface(data_width=64, address_width=32, id_width=8)
+        params = vexii_core._bus_params("mBus", mbus, vexii_core._MBUS_SIGS)
+        self.assertEqual(set(params.keys()), MBUS_PORTS)
+        self.assertIs(params["o_mBus_awvalid"], mbus.aw.valid)
+        self.assertIs(params["i_mBus_rdata"],   mbus.r.data)
+        self.assertIsInstance(params["o_mBus_awallStrb"], Open)
+
+    def test_dma_bus_ports(self):
+        dma_bus = axi.AXIInterface(data_width=32, address_width=32, id_width=4)
+        params  = vexii_core._bus_params("dma_bus", dma_bus, vexii_core._DMA_BUS_SIGS)
+        self.assertEqual(set(params.keys()), DMA_BUS_PORTS)
+        self.assertIs(params["i_dma_bus_awvalid"], dma_bus.aw.valid)
+        self.assertIs(params["o_dma_bus_rdata"],   dma_bus.r.data)
+
+    def test_jtag_tap_ports(self):
+        cpu = VexiiRiscv(platform=None, variant="standard", config=_config())
+        ports = set(cpu.cpu_params.keys())
+        cpu.add_jtag_ports(vexii_core._JTAG_TAP_PORTS)
+        self.assertEqual(set(cpu.cpu_params.keys()) - ports, JTAG_TAP_PORTS)
+        self.assertIs(cpu.cpu_params["i_debug_tap_jtag_tck"], cpu.jtag_clk)
+        self.assertIs(cpu.cpu_params["o_debug_tap_jtag_tdo"], cpu.jtag_tdo)
+        self.assertEqual(cpu.jtag_tms.backtrace[-1][0], "jtag_tms")
+
+    def test_jtag_instruction_ports(self):
+        cpu = VexiiRiscv(platform=None, variant="standard", config=_config())
+        ports = set(cpu.cpu_params.keys())
+        cpu.add_jtag_ports(vexii_core._JTAG_INSTRUCTION_PORTS)
+        self.assertEqual(set(cpu.cpu_params.keys()) - ports, JTAG_INSTRUCTION_PORTS)
+        self.assertIs(cpu.cpu_params["i_debug_tck"], cpu.jtag_clk)
+        self.assertIs(cpu.cpu_params["i_debug_instruction_instruction_enable"], cpu.jtag_enable)
+
+    def test_instances_configs(self):
+        # Class defaults are the VexiiRiscvConfig defaults.
+        default = VexiiRiscv.get_config()
+        self.assertEqual(default, VexiiRiscvConfig())
+
+        cpu_a = VexiiRiscv(platform=None, variant="standard", config=_config())
+        cpu_b = VexiiRiscv(platform=None, variant="standard", config=_config(cpu_count=2, with_dma=True))
+        ports_a = set(cpu_a.cpu_params.keys())
+        ports_b = set(cpu_b.cpu_params.keys())
+        self.assertFalse(ports_a & DMA_BUS_PORTS)
+        self.assertEqual(ports_b - ports_a, DMA_BUS_PORTS)
+
+        cpu_a.add_memory_buses(address_width=32, data_width=64)
+        cpu_b.add_memory_buses(address_width=32, data_width=128)
+        cpu_b.set_reset_address(0x4000_0000)
+        self.assertEqual(cpu_a.memory_buses[0].data_width, 64)
+        self.assertEqual(cpu_b.memory_buses[0].data_width, 128)
+        self.assertEqual(cpu_a.config, _config(litedram_width=64))
+        self.assertEqual(cpu_b.config, _config(cpu_count=2, with_dma=True, litedram_width=128, reset_address=0x4000_0000))
+        self.assertNotEqual(
+            VexiiRiscv.generate_netlist_name(cpu_a.config),
+            VexiiRiscv.generate_netlist_name(cpu_b.config))
+
+        # Instances do not write back to the class.
+        self.assertEqual(VexiiRiscv.get_config(), default)
+
+    def test_ram_filename(self):
+        # Board platforms subclass the vendor platforms from their own modules.
+        class AlteraBoardPlatform(AlteraPlatform):   pass
+        class EfinixBoardPlatform(EfinixPlatform):   pass
+        class GenericBoardPlatform(GenericPlatform): pass
+        for platform_cls, ram_filename in [
+            (AlteraBoardPlatform,  "Ram_1w_1rs_Intel.v"),
+            (EfinixBoardPlatform,  "Ram_1w_1rs_Efinix.v"),
+            (GenericBoardPlatform, "Ram_1w_1rs_Generic.v"),
+        ]:
+            platform = platform_cls.__new__(platform_cls)
+            self.assertEqual(vexii_core._ram_filename(platform), ram_filename)
+
+    def test_netlist_name_regions(self):
+        config  = _config()
+        regions = config.memory_regions
+        name    = VexiiRiscv.generate_netlist_name(config)
+
+        # Same regions in a different order: same netlist.
+        self.assertEqual(VexiiRiscv.generate_netlist_name(_config(memory_regions=regions[::-1])), name)
+
+        # Any region field change: different netlist.
+        for field, value in [("origin", 0x2000_0000), ("size", 0x0004_0000), ("mode", "rwxc"), ("bus", "m")]:
+            changed = (regions[0]._replace(**{field: value}),) + regions[1:]
+            self.assertNotEqual(VexiiRiscv.generate_netlist_name(_config(memory_regions=changed)), name, field)
+
+        # Removed region: different netlist.
+        self.assertNotEqual(VexiiRiscv.generate_netlist_name(_config(memory_regions=regions[1:])), name)